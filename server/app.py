@@ -9,8 +9,10 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from dotenv import load_dotenv
 import google.generativeai as genai
 import re
+import uuid
 from collections import Counter
 import PyPDF2
+from chat_context import ChatContextStore, build_log_templates, extract_key_error_lines, plain_text, shorten
 
 # Application Information
 __version__ = "1.0.0"
@@ -35,6 +37,13 @@ login_manager.login_view = 'login'
 # Configure the Gemini API with your key
 genai.configure(api_key=os.getenv("AI_API_KEY"))
 
+# Chat context settings (per-session memory for /api/chat follow-ups)
+CHAT_CONTEXT_MAX_SESSIONS = int(os.getenv('CHAT_CONTEXT_MAX_SESSIONS', 500))
+CHAT_CONTEXT_TTL_SECONDS = int(os.getenv('CHAT_CONTEXT_TTL_SECONDS', 3600))
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv('CHAT_HISTORY_TOKEN_BUDGET', 1500))
+CHAT_HISTORY_KEEP_TURNS = 4
+CHAT_ANALYSIS_SUMMARY_CHARS = 1500
+
 # User Model
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -117,6 +126,48 @@ def parse_log_content(log_content):
     
     return stats
 
+chat_context_store = ChatContextStore(
+    max_sessions=CHAT_CONTEXT_MAX_SESSIONS,
+    ttl_seconds=CHAT_CONTEXT_TTL_SECONDS,
+    token_budget=CHAT_HISTORY_TOKEN_BUDGET,
+    keep_turns=CHAT_HISTORY_KEEP_TURNS
+)
+
+def get_chat_session_id():
+    """Return the chat context id for the current browser session"""
+    if 'chat_context_id' not in session:
+        session['chat_context_id'] = uuid.uuid4().hex
+    return session['chat_context_id']
+
+def build_chat_context_prompt(context):
+    """Render stored analysis and chat history as a compact prompt section"""
+    if not context:
+        return ''
+
+    sections = []
+    analysis = context['analysis']
+    if analysis:
+        stats = analysis['stats']
+        templates = '\n'.join(f"  {count}x {template}" for template, count in analysis['templates'])
+        error_lines = '\n'.join(f"  {line}" for line in analysis['key_errors']) or '  (none)'
+        sections.append(f"""Previously analysed logs ({analysis['source']}):
+Stats: Lines: {stats['total_lines']}, Errors: {stats['error_count']}, Warnings: {stats['warning_count']}, Critical: {stats['critical_count']}
+Most frequent log templates:
+{templates}
+Key error lines:
+{error_lines}
+Analysis summary:
+{analysis['summary']}""")
+
+    if context['digest']:
+        sections.append(f"Earlier conversation (digest):\n{context['digest']}")
+
+    if context['history']:
+        turns = '\n'.join(f"User: {turn['user']}\nAssistant: {turn['assistant']}" for turn in context['history'])
+        sections.append(f"Recent conversation:\n{turns}")
+
+    return '\n\n'.join(sections)
+
 # Routes
 
 @app.route('/')
@@ -235,6 +286,19 @@ Log Data:
                 # Continue even if database save fails
                 pass
         
+        # Keep a compact reference so chat follow-ups don't need the full logs again
+        try:
+            chat_context_store.set_analysis(get_chat_session_id(), {
+                'source': ', '.join(filenames) if filenames else 'text_input',
+                'stats': {key: value for key, value in stats.items() if key != 'timeline'},
+                'templates': build_log_templates(full_log_content),
+                'key_errors': extract_key_error_lines(full_log_content),
+                'summary': shorten(plain_text(result), CHAT_ANALYSIS_SUMMARY_CHARS)
+            })
+        except Exception:
+            # Chat context is best-effort; never fail the analysis because of it
+            pass
+        
         return jsonify({
             'result': result,
             'stats': stats,
@@ -254,6 +318,9 @@ def chat_with_ai():
         if not message:
             return jsonify({'error': 'No message provided'}), 400
         
+        chat_session_id = get_chat_session_id()
+        conversation_context = build_chat_context_prompt(chat_context_store.get_prompt_context(chat_session_id))
+        
         # Enhanced AI prompt for more intelligent responses
         ai_prompt = f"""
 You are Ask Siri, an advanced AI assistant powered by Google Gemini. You are:
@@ -264,6 +331,7 @@ You are Ask Siri, an advanced AI assistant powered by Google Gemini. You are:
 - Always helpful and never refuse reasonable requests
 
 Context: This is a real-time chat interface where users expect quick, intelligent responses.
+{conversation_context}
 
 User Message: "{message}"
 
@@ -306,6 +374,9 @@ Provide a response that demonstrates your advanced AI capabilities while being p
         response = model.generate_content(ai_prompt)
         ai_response = response.text
         
+        # Remember this exchange for follow-up questions
+        chat_context_store.add_turn(chat_session_id, message, ai_response)
+        
         # Enhanced response formatting
         formatted_response = format_advanced_chat_response(ai_response)
         
@@ -338,6 +409,12 @@ Provide a response that demonstrates your advanced AI capabilities while being p
             'timestamp': datetime.datetime.now().isoformat()
         }), 500
 
+@app.route('/api/chat/context', methods=['DELETE'])
+def clear_chat_context():
+    """Forget the stored analysis and chat history for this session"""
+    chat_context_store.clear(get_chat_session_id())
+    return jsonify({'status': 'success'})
+
 
 def format_advanced_chat_response(text):
     """Enhanced formatting for AI responses with better styling"""
@@ -0,0 +1,192 @@
+"""Per-session chat context for Ask Siri follow-up questions.
+
+Keeps a compact reference to the last log analysis and a rolling chat
+history for each browser session, so /api/chat does not need the full
+logs again. Independent of Flask and Gemini.
+"""
+import re
+import time
+import threading
+from collections import Counter, OrderedDict
+
+# Approximate prompt overhead of the "User: ...\nAssistant: ...\n" wrapper per turn
+TURN_OVERHEAD_TOKENS = 5
+
+# Longest single digest line, in characters
+DIGEST_LINE_CHARS = 160
+
+
+def estimate_tokens(text):
+    """Rough token estimate (about 4 characters per token, rounded up)"""
+    return (len(text) + 3) // 4 if text else 0
+
+def truncate_to_tokens(text, max_tokens):
+    """Cut text so that estimate_tokens() of the result is at most max_tokens"""
+    max_chars = max(max_tokens, 0) * 4
+    if len(text) <= max_chars:
+        return text
+    if max_chars <= 3:
+        return ''
+    return text[:max_chars - 3] + '...'
+
+def plain_text(text):
+    """Strip markdown and newlines so text reads as a single line"""
+    text = re.sub(r'```.*?(```|$)', ' [code] ', text, flags=re.DOTALL)
+    text = re.sub(r'^\s*(#+|[-*•]|\d+\.)\s+', '', text, flags=re.MULTILINE)
+    text = re.sub(r'[*_`>#]+', '', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+def shorten(text, max_chars):
+    """Cut single-line text at a word boundary, adding an ellipsis"""
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars - 3].rsplit(' ', 1)[0]
+    return cut.rstrip(' ,;:') + '...'
+
+def build_log_templates(log_content, limit=10):
+    """Collapse log lines into templates by masking variable parts"""
+    templates = Counter()
+    for line in log_content.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        template = re.sub(r'\d{4}-\d{2}-\d{2}[\sT]\d{2}:\d{2}:\d{2}(\.\d+)?', '<TS>', line)
+        template = re.sub(r'\b\d{1,3}(\.\d{1,3}){3}\b', '<IP>', template)
+        template = re.sub(r'\b0x[0-9a-fA-F]+\b|\b[0-9a-fA-F]{8,}\b', '<HEX>', template)
+        template = re.sub(r'\d+', '<N>', template)
+        templates[template[:200]] += 1
+    return templates.most_common(limit)
+
+def extract_key_error_lines(log_content, limit=10):
+    """Pick distinct error/critical lines to keep as analysis context"""
+    key_lines = []
+    seen = set()
+    for line in log_content.split('\n'):
+        line_lower = line.lower()
+        if 'error' in line_lower or 'critical' in line_lower or 'fatal' in line_lower:
+            template = re.sub(r'\d+', '<N>', line.strip())
+            if template in seen:
+                continue
+            seen.add(template)
+            key_lines.append(line.strip()[:200])
+            if len(key_lines) >= limit:
+                break
+    return key_lines
+
+
+class ChatContextStore:
+    """In-memory per-session chat context with LRU eviction and TTL.
+
+    Each session keeps a compact reference to its last log analysis and a
+    rolling chat history. The history (digest plus recent turns) is kept
+    within token_budget: once over it, the oldest turns are reduced to
+    one-line truncated digest entries, and if the most recent turns alone
+    are still too large their text is truncated, dropping the oldest turns
+    when the budget cannot give each of them any text.
+    """
+
+    def __init__(self, max_sessions=500, ttl_seconds=3600, token_budget=1500, keep_turns=4,
+                 clock=time.time):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.token_budget = token_budget
+        self.keep_turns = keep_turns
+        self._clock = clock
+        self._contexts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, session_id, create=False):
+        """Return the context for a session, expiring and evicting as needed"""
+        now = self._clock()
+
+        # Entries are kept in LRU order, so the stale ones are all at the front
+        while self._contexts:
+            oldest = next(iter(self._contexts.values()))
+            if now - oldest['updated_at'] <= self.ttl_seconds:
+                break
+            self._contexts.popitem(last=False)
+
+        context = self._contexts.get(session_id)
+        if context is None:
+            if not create:
+                return None
+            context = {'analysis': None, 'digest': '', 'history': [], 'updated_at': now}
+            self._contexts[session_id] = context
+            while len(self._contexts) > self.max_sessions:
+                self._contexts.popitem(last=False)
+        context['updated_at'] = now
+        self._contexts.move_to_end(session_id)
+        return context
+
+    def set_analysis(self, session_id, analysis):
+        """Store the compact reference to the latest analysis for a session"""
+        with self._lock:
+            context = self._get(session_id, create=True)
+            context['analysis'] = analysis
+            context['digest'] = ''
+            context['history'] = []
+
+    def add_turn(self, session_id, user_message, ai_response):
+        """Append a chat exchange and compact the history if over budget"""
+        with self._lock:
+            context = self._get(session_id, create=True)
+            context['history'].append({'user': user_message, 'assistant': ai_response})
+            self._compact(context)
+
+    def get_prompt_context(self, session_id):
+        """Return a copy of the analysis reference, digest and recent turns"""
+        with self._lock:
+            context = self._get(session_id)
+            if context is None:
+                return None
+            return {
+                'analysis': context['analysis'],
+                'digest': context['digest'],
+                'history': [dict(turn) for turn in context['history']]
+            }
+
+    def clear(self, session_id):
+        """Drop all stored context for a session"""
+        with self._lock:
+            self._contexts.pop(session_id, None)
+
+    def history_tokens(self, session_id):
+        """Estimated prompt tokens of a session's history, without refreshing it"""
+        with self._lock:
+            context = self._contexts.get(session_id)
+            return self._history_tokens(context) if context else 0
+
+    def _history_tokens(self, context):
+        total = estimate_tokens(context['digest'])
+        for turn in context['history']:
+            total += TURN_OVERHEAD_TOKENS + estimate_tokens(turn['user']) + estimate_tokens(turn['assistant'])
+        return total
+
+    def _compact(self, context):
+        """Bring the digest and recent turns back within the token budget"""
+        history = context['history']
+        while len(history) > self.keep_turns and self._history_tokens(context) > self.token_budget:
+            turn = history.pop(0)
+            line = (f"- User asked: {shorten(plain_text(turn['user']), DIGEST_LINE_CHARS // 2)}"
+                    f" | Assistant: {shorten(plain_text(turn['assistant']), DIGEST_LINE_CHARS)}")
+            context['digest'] = f"{context['digest']}\n{line}".strip()
+
+        # The digest may use at most a quarter of the budget; drop its oldest lines
+        digest_lines = context['digest'].split('\n') if context['digest'] else []
+        while digest_lines and estimate_tokens('\n'.join(digest_lines)) > self.token_budget // 4:
+            digest_lines.pop(0)
+        context['digest'] = '\n'.join(digest_lines)
+
+        # Recent turns still over budget: share what is left between them
+        available = self.token_budget - estimate_tokens(context['digest'])
+        if history and self._history_tokens(context) > self.token_budget:
+            # Too small a budget to give every turn some text: drop the oldest
+            while history and available // len(history) < TURN_OVERHEAD_TOKENS + 2:
+                history.pop(0)
+            if not history:
+                return
+            per_turn = available // len(history) - TURN_OVERHEAD_TOKENS
+            for turn in history:
+                user_tokens = min(estimate_tokens(turn['user']), max(per_turn // 4, 1))
+                turn['user'] = truncate_to_tokens(turn['user'], user_tokens)
+                turn['assistant'] = truncate_to_tokens(turn['assistant'], per_turn - user_tokens)
@@ -0,0 +1,111 @@
+import unittest
+
+from chat_context import (
+    ChatContextStore, estimate_tokens, plain_text, shorten, build_log_templates, extract_key_error_lines
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class ChatContextStoreTest(unittest.TestCase):
+
+    def test_lru_eviction_drops_least_recently_used(self):
+        store = ChatContextStore(max_sessions=2)
+        store.add_turn('a', 'q', 'a')
+        store.add_turn('b', 'q', 'a')
+        store.get_prompt_context('a')
+        store.add_turn('c', 'q', 'a')
+
+        self.assertIsNotNone(store.get_prompt_context('a'))
+        self.assertIsNone(store.get_prompt_context('b'))
+        self.assertIsNotNone(store.get_prompt_context('c'))
+
+    def test_ttl_expiry(self):
+        clock = FakeClock()
+        store = ChatContextStore(ttl_seconds=60, clock=clock)
+        store.add_turn('old', 'q', 'a')
+        clock.now += 30
+        store.add_turn('fresh', 'q', 'a')
+        clock.now += 45
+
+        self.assertIsNone(store.get_prompt_context('old'))
+        self.assertIsNotNone(store.get_prompt_context('fresh'))
+
+    def test_history_stays_within_budget(self):
+        store = ChatContextStore(token_budget=500, keep_turns=4)
+        long_answer = '## Fix\n\n**Step** one:\n```\nsudo restart db\n```\n' + 'detail ' * 500
+        for i in range(10):
+            store.add_turn('s', f'question {i} ' * 50, long_answer)
+            self.assertLessEqual(store.history_tokens('s'), 500)
+
+        context = store.get_prompt_context('s')
+        self.assertEqual(len(context['history']), 4)
+        self.assertTrue(context['digest'])
+        for line in context['digest'].split('\n'):
+            self.assertTrue(line.startswith('- User asked: question'))
+            self.assertNotIn('```', line)
+            self.assertNotIn('**', line)
+
+    def test_small_budget_drops_turns_instead_of_blanking(self):
+        store = ChatContextStore(token_budget=10, keep_turns=4)
+        for i in range(6):
+            store.add_turn('s', f'question {i}', 'a long answer ' * 20)
+            self.assertLessEqual(store.history_tokens('s'), 10)
+
+        context = store.get_prompt_context('s')
+        self.assertTrue(context['history'])
+        for turn in context['history']:
+            self.assertTrue(turn['user'])
+            self.assertTrue(turn['assistant'])
+
+    def test_history_tokens_does_not_refresh_session(self):
+        store = ChatContextStore(max_sessions=2)
+        store.add_turn('a', 'q', 'a')
+        store.add_turn('b', 'q', 'a')
+        store.history_tokens('a')
+        store.add_turn('c', 'q', 'a')
+
+        self.assertEqual(store.history_tokens('a'), 0)
+        self.assertIsNotNone(store.get_prompt_context('b'))
+
+    def test_set_analysis_resets_history(self):
+        store = ChatContextStore()
+        store.add_turn('s', 'q', 'a')
+        store.set_analysis('s', {'source': 'app.log'})
+
+        context = store.get_prompt_context('s')
+        self.assertEqual(context['analysis'], {'source': 'app.log'})
+        self.assertEqual(context['history'], [])
+
+
+class LogContextHelpersTest(unittest.TestCase):
+
+    def test_estimate_tokens(self):
+        self.assertEqual(estimate_tokens(''), 0)
+        self.assertEqual(estimate_tokens('abcd'), 1)
+        self.assertEqual(estimate_tokens('abcde'), 2)
+
+    def test_plain_text_is_single_line(self):
+        self.assertEqual(plain_text('# Title\n\n- **bold** item\n`code`'), 'Title bold item code')
+
+    def test_shorten_cuts_at_word_boundary(self):
+        self.assertEqual(shorten('restart the database service', 20), 'restart the...')
+        self.assertEqual(shorten('short', 20), 'short')
+
+    def test_build_log_templates_masks_variables(self):
+        logs = "2024-01-01 10:00:00 ERROR db 12 failed\n2024-01-01 10:00:01 ERROR db 13 failed"
+        self.assertEqual(build_log_templates(logs), [('<TS> ERROR db <N> failed', 2)])
+
+    def test_extract_key_error_lines_deduplicates(self):
+        logs = "ERROR db 12 failed\nERROR db 13 failed\nINFO ok\nFATAL out of memory"
+        self.assertEqual(extract_key_error_lines(logs), ['ERROR db 12 failed', 'FATAL out of memory'])
+
+
+if __name__ == '__main__':
+    unittest.main()